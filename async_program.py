@@ -0,0 +1,489 @@
+"""Async serving mode for program.py.
+
+Serves the same staff/donor/login routes, models and role checks as an ASGI
+application on SQLAlchemy's asyncio engine, so a slow database ties up a
+coroutine instead of a worker thread:
+
+    uvicorn async_program:app
+
+Needs an async driver for the database (aiomysql for MySQL, aiosqlite for
+SQLite). The URI comes from ASYNC_DATABASE_URI, or is derived from
+SQLALCHEMY_DATABASE_URI by swapping in the async driver. Bulk, export and
+admin routes are only served by the Flask app.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from urllib.parse import parse_qsl
+
+import jwt as pyjwt
+from flask_jwt_extended import create_access_token, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.datastructures import MultiDict
+
+from program import (DONOR_REQUIRED_FIELDS, DONOR_UPDATABLE_FIELDS, IDENTITY_FIELDS, INTEGRITY_ERROR,
+                     STAFF_REQUIRED_FIELDS, STAFF_UPDATABLE_FIELDS, ChangeLog, Donors, IdempotencyKey, InvalidQuery,
+                     Staff, app as flask_app, attach_related, cache_key, change_entry, check_credentials, claims_cache,
+                     column_select, donor_identity_key, field_error, filter_records, idempotency_claim,
+                     idempotency_conflict, idempotency_scope, idempotency_takeover, include_columns, int_arg,
+                     invalidate_record, payload_etag, record_cache, related_select, request_fingerprint,
+                     requested_fields, requested_includes, summary_deltas, summary_upsert, utcnow, writable_columns)
+
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+RESOURCES = {
+    "staff": {
+        "model": Staff,
+        "required_fields": STAFF_REQUIRED_FIELDS,
+        "updatable_fields": STAFF_UPDATABLE_FIELDS,
+        "create_roles": ("admin",),
+        "create_endpoint": "add_staff",
+        "not_found": {"GET": "Staff not found", "PUT": "Staff not found", "DELETE": "Staff not found"},
+        "deleted": "Staff successfully deleted"
+    },
+    "donor": {
+        "model": Donors,
+        "required_fields": DONOR_REQUIRED_FIELDS,
+        "updatable_fields": DONOR_UPDATABLE_FIELDS,
+        "create_roles": ("admin", "donor"),
+        "create_endpoint": "add_donor",
+        "not_found": {"GET": "Donors not found", "PUT": "Donor not found", "DELETE": "Donors not found"},
+        "deleted": "Donor successfully deleted"
+    }
+}
+
+
+def async_database_uri(config):
+    if config.get('ASYNC_DATABASE_URI'):
+        return config['ASYNC_DATABASE_URI']
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+
+def dumps(payload):
+    # Matches jsonify() so both serving modes return the same bytes.
+    return (flask_app.json.dumps(payload, indent=None, separators=(",", ":")) + "\n").encode()
+
+
+class AuthError(Exception):
+    def __init__(self, status, msg):
+        super().__init__(msg)
+        self.status = status
+        self.msg = msg
+
+
+class Request:
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        self.args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        self.body = body
+        self.claims = None
+
+    @property
+    def is_json(self):
+        mimetype = self.headers.get("content-type", "").split(";")[0].strip()
+        return mimetype == "application/json" or (mimetype.startswith("application/") and mimetype.endswith("+json"))
+
+    def get_json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+class Response:
+
+    def __init__(self, body=b"", status=200, headers=None, stream=None, content_type="application/json"):
+        self.body = body
+        self.status = status
+        self.headers = dict(headers or {})
+        self.headers.setdefault("content-type", content_type)
+        self.stream = stream
+
+    async def send(self, send):
+        headers = [(key.encode("latin-1"), str(value).encode("latin-1")) for key, value in self.headers.items()]
+        if self.stream is None:
+            headers.append((b"content-length", str(len(self.body)).encode()))
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        if self.stream is None:
+            await send({"type": "http.response.body", "body": self.body})
+            return
+        async for chunk in self.stream:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def json_response(payload, status=200, headers=None):
+    return Response(dumps(payload), status, headers)
+
+
+class AsyncApp:
+
+    def __init__(self, config=None):
+        self.config = dict(flask_app.config, **(config or {}))
+        if self.config['SHARDS']:
+            raise RuntimeError("The async server does not support SHARDS; run the Flask app instead")
+        self._engine = None
+        self.routes = [("POST", re.compile(r"^/login$"), self.login, None)]
+        for name, resource in RESOURCES.items():
+            collection = re.compile(rf"^/{name}$")
+            item = re.compile(rf"^/{name}/(?P<id>\d+)$")
+            self.routes += [
+                ("GET", collection, self.list_records, ("admin",)),
+                ("POST", collection, self.add_record, resource["create_roles"]),
+                ("GET", item, self.get_record, ("admin",)),
+                ("PUT", item, self.update_record, ("admin",)),
+                ("DELETE", item, self.delete_record, ("admin",))
+            ]
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            uri = async_database_uri(self.config)
+            options = self.config['ASYNC_ENGINE_OPTIONS']
+            if make_url(uri).get_backend_name() == "sqlite":
+                # SQLite's async pool is not sized; concurrency is bounded by the file lock.
+                options = {key: value for key, value in options.items() if key not in ("pool_size", "max_overflow", "pool_timeout")}
+            self._engine = create_async_engine(uri, **options)
+        return self._engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        # The shared helpers read config and caches through current_app.
+        with flask_app.app_context():
+            response = await self.dispatch(Request(scope, body))
+        await response.send(send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._engine is not None:
+                    await self._engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def dispatch(self, request):
+        allowed = False
+        for method, pattern, handler, roles in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            resource = RESOURCES.get(request.path.split("/")[1])
+            try:
+                if roles is not None:
+                    claims = request.claims = self.authorize(request)
+                    if claims.get("role") not in roles:
+                        return json_response({"success": False, "msg": "Access forbidden."}, 403)
+                return await handler(request, resource, **match.groupdict())
+            except AuthError as e:
+                return json_response({"msg": e.msg}, e.status)
+            except InvalidQuery as e:
+                return json_response({"success": False, "error": str(e)}, 400)
+        if allowed:
+            return json_response({"success": False, "error": "Method not allowed"}, 405)
+        return json_response({"success": False, "error": "Not found"}, 404)
+
+    def authorize(self, request):
+        # Same rules and messages as the Flask app's role_required, sharing its
+        # decoded-claims cache.
+        header = request.headers.get("authorization")
+        if not header:
+            raise AuthError(401, "Missing Authorization Header")
+        scheme, _, token = header.partition(" ")
+        if scheme != "Bearer" or not token:
+            raise AuthError(401, "Missing 'Bearer' type in 'Authorization' header. Expected 'Authorization: Bearer <JWT>'")
+        key = hashlib.sha256(token.encode()).digest()
+        cached = claims_cache().get(key)
+        if cached is not None:
+            return cached[1]
+        try:
+            claims = decode_token(token)
+        except pyjwt.ExpiredSignatureError:
+            raise AuthError(401, "Token has expired")
+        except (pyjwt.InvalidTokenError, JWTExtendedException) as e:
+            raise AuthError(422, str(e))
+        if claims.get("type") != "access":
+            # As verify_jwt_in_request(): refresh tokens only work where asked for.
+            raise AuthError(422, "Only non-refresh tokens are allowed")
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl > 0:
+            claims_cache().set(key, (pyjwt.get_unverified_header(token), claims), ttl=ttl)
+        return claims
+
+    async def login(self, request, resource):
+        data = request.get_json() or {}
+        user = check_credentials(data.get("username"), data.get("password"))
+        if not user:
+            return json_response({"msg": "Invalid username or password"}, 401)
+        identity, role = user
+        token = create_access_token(identity=identity, additional_claims={"role": role})
+        return json_response({"Token": token})
+
+    async def fetch_payload(self, conn, model, id, fields=None, includes=()):
+        stmt = column_select(model, fields or list(model.serialized_columns)).where(model.id == id)
+        row = (await conn.execute(stmt.add_columns(*include_columns(model, includes)))).mappings().first()
+        if row is None:
+            return None
+        return (await self.load_related(model, includes, [dict(row)]))[0]
+
+    async def load_related(self, model, includes, records):
+        # As program.load_related(): one query per include for the batch, on
+        # a connection of its own so it can run while rows are streaming.
+        if not includes or not records:
+            return records
+        async with AsyncSession(self.engine) as session:
+            for name in includes:
+                stmt = related_select(model, name, records)
+                attach_related(model, name, records, (await session.execute(stmt)).scalars() if stmt is not None else ())
+        return records
+
+    async def list_records(self, request, resource):
+        model = resource["model"]
+        after = int_arg("after", request.args)
+        limit = int_arg("limit", request.args)
+        fields = requested_fields(model, request.args) or list(model.serialized_columns)
+        includes = requested_includes(model, request.args)
+        stmt = column_select(model, fields).add_columns(*include_columns(model, includes))
+        stmt = filter_records(model, stmt, request.args).order_by(model.id)
+        if after is None and limit is None:
+            return Response(stream=self.stream_rows(model, stmt, includes))
+
+        if limit is None:
+            limit = self.config['DEFAULT_PAGE_SIZE']
+        if limit < 1:
+            raise InvalidQuery("limit must be a positive integer")
+        limit = min(limit, self.config['MAX_PAGE_SIZE'])
+        if after is not None:
+            stmt = stmt.where(model.id > after)
+        async with self.engine.connect() as conn:
+            records = [dict(row) for row in (await conn.execute(stmt.limit(limit + 1))).mappings()]
+        next_cursor = records[limit - 1]["id"] if len(records) > limit else None
+        data = await self.load_related(model, includes, records[:limit])
+        return json_response({"success": True, "data": data, "next": next_cursor})
+
+    async def stream_rows(self, model, stmt, includes=()):
+        batch_size = self.config['STREAM_BATCH_SIZE']
+        async with self.engine.connect() as conn:
+            result = await conn.stream(stmt.execution_options(yield_per=batch_size))
+            yield b'{"data":['
+            first = True
+            async for rows in result.mappings().partitions(batch_size):
+                for record in await self.load_related(model, includes, [dict(row) for row in rows]):
+                    yield (b"" if first else b",") + flask_app.json.dumps(record).encode()
+                    first = False
+            yield b'],"success":true}'
+
+    async def get_record(self, request, resource, id):
+        model = resource["model"]
+        id = int(id)
+        fields = requested_fields(model, request.args)
+        includes = requested_includes(model, request.args)
+        key = cache_key(model, id)
+        # The cache only holds the record itself, not what it references.
+        entry = record_cache().get(key) if not includes else None
+        if entry is None:
+            async with self.engine.connect() as conn:
+                payload = await self.fetch_payload(conn, model, id, fields, includes)
+            etag = payload_etag(payload)
+            if payload is not None and fields is None and not includes:
+                record_cache().set(key, (payload, etag))
+        else:
+            payload, etag = entry
+            if fields is not None:
+                payload = {name: payload[name] for name in fields}
+                etag = payload_etag(payload)
+
+        if payload is None:
+            return json_response({"success": False, "error": resource["not_found"]["GET"]}, 404)
+        if f'"{etag}"' in request.headers.get("if-none-match", ""):
+            return Response(status=304, headers={"etag": f'"{etag}"'})
+        return json_response({"success": True, "data": payload}, headers={"etag": f'"{etag}"'})
+
+    async def add_record(self, request, resource):
+        # Idempotency-Key handling as in program.idempotent(), sharing its
+        # table and key scoping so retries may land on either serving mode.
+        header = request.headers.get("idempotency-key")
+        if header is None:
+            return await self.create_record(request, resource)
+        if not header or len(header) > 255:
+            return json_response({"success": False, "error": "Invalid Idempotency-Key"}, 400)
+
+        key = idempotency_scope(request.claims.get("sub"), resource["create_endpoint"], header)
+        fingerprint = request_fingerprint(request.method, request.path, request.body)
+        now = utcnow()
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(idempotency_claim(key, fingerprint, now))
+        except IntegrityError:
+            async with self.engine.begin() as conn:
+                claimed = (await conn.execute(idempotency_takeover(key, fingerprint, now))).rowcount
+                record = None if claimed else (await conn.execute(select(IdempotencyKey).where(IdempotencyKey.key == key))).first()
+            if not claimed:
+                if record is None:
+                    return json_response({"success": False, "error": "A request with this Idempotency-Key is still in progress"}, 409)
+                conflict = idempotency_conflict(record, fingerprint)
+                if conflict is not None:
+                    return json_response(*conflict)
+                return Response(record.response.encode(), record.status_code, {"idempotent-replayed": "true"})
+
+        response = await self.create_record(request, resource)
+        async with self.engine.begin() as conn:
+            if response.status >= 500:
+                await conn.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+            else:
+                await conn.execute(
+                    update(IdempotencyKey).where(IdempotencyKey.key == key).values(
+                        status_code=response.status,
+                        response=response.body.decode()
+                    )
+                )
+        return response
+
+    async def create_record(self, request, resource):
+        model = resource["model"]
+        if not request.is_json:
+            return json_response({"success": False, "error": "Content-type must be application/json"}, 400)
+        data = request.get_json()
+        if not data:
+            return json_response({"success": False, "error": "Invalid JSON"}, 400)
+        for field in resource["required_fields"]:
+            if field not in data:
+                return json_response({"success": False, "error": f"Missing field: {field}"}, 400)
+        error = field_error(model, data)
+        if error:
+            return json_response({"success": False, "error": error}, 400)
+
+        values = {column: data[column] for column in writable_columns(model) if column in data}
+        try:
+            async with self.engine.begin() as conn:
+                if model is Donors:
+                    values["identity_key"] = donor_identity_key(*(data[field] for field in IDENTITY_FIELDS))
+                    existing = (await conn.execute(
+                        select(Donors.id).where(Donors.identity_key == values["identity_key"]).limit(1)
+                    )).scalar()
+                    if existing is not None:
+                        return json_response({"success": False, "error": "Donor already exists", "id": existing}, 409)
+                result = await conn.execute(insert(model.__table__).values(**values))
+                payload = await self.fetch_payload(conn, model, result.inserted_primary_key[0])
+                await self.log_changes(conn, change_entry(model.__tablename__, "create", payload["id"], payload))
+                await self.update_summaries(conn, model, None, payload)
+        except IntegrityError:
+            return json_response({"success": False, "error": INTEGRITY_ERROR}, 409)
+        return json_response({"success": True, "data": payload}, 201)
+
+    async def update_record(self, request, resource, id):
+        model = resource["model"]
+        id = int(id)
+        try:
+            async with self.engine.begin() as conn:
+                previous = await self.fetch_payload(conn, model, id)
+                if previous is None:
+                    return json_response({"success": False, "error": resource["not_found"]["PUT"]}, 404)
+                data = request.get_json()
+                if not data:
+                    return json_response({"success": False, "error": "Invalid JSON"}, 400)
+                error = field_error(model, data)
+                if error:
+                    return json_response({"success": False, "error": error}, 400)
+                columns = model.__table__.columns
+                values = {field: data[field] for field in resource["updatable_fields"] if field in data and field in columns}
+                if values:
+                    await conn.execute(update(model.__table__).where(model.id == id).values(**values))
+                payload = await self.fetch_payload(conn, model, values.get("id", id))
+                if model is Donors and any(field in values for field in IDENTITY_FIELDS):
+                    key = donor_identity_key(*(payload[field] for field in IDENTITY_FIELDS))
+                    await conn.execute(update(Donors.__table__).where(Donors.id == payload["id"]).values(identity_key=key))
+                if values:
+                    entries = [change_entry(model.__tablename__, "update", payload["id"], payload)]
+                    if payload["id"] != id:
+                        entries.insert(0, change_entry(model.__tablename__, "delete", id))
+                    await self.log_changes(conn, *entries)
+                    await self.update_summaries(conn, model, previous, payload)
+        except IntegrityError:
+            # An id or reference that conflicts, as program.integrity_error().
+            return json_response({"success": False, "error": INTEGRITY_ERROR}, 409)
+        invalidate_record(model, id, payload["id"])
+        return json_response({"success": True, "data": payload})
+
+    async def delete_record(self, request, resource, id):
+        model = resource["model"]
+        id = int(id)
+        async with self.engine.begin() as conn:
+            previous = await self.fetch_payload(conn, model, id)
+            result = await conn.execute(delete(model.__table__).where(model.id == id))
+            if result.rowcount:
+                await self.log_changes(conn, change_entry(model.__tablename__, "delete", id))
+                await self.update_summaries(conn, model, previous, None)
+        if not result.rowcount:
+            return json_response({"success": False, "error": resource["not_found"]["DELETE"]}, 404)
+        invalidate_record(model, id)
+        return json_response({"success": True, "message": resource["deleted"]})
+
+    async def log_changes(self, conn, *entries):
+        # Core writes bypass the session's flush hooks, so change log entries
+        # and summary counts are written here, in the same transaction.
+        await conn.execute(insert(ChangeLog.__table__), list(entries))
+
+    async def update_summaries(self, conn, model, old, new):
+        stmt, rows = summary_upsert(conn.dialect.name, summary_deltas(model, old, new))
+        if rows:
+            await conn.execute(stmt, rows)
+
+
+async def asgi_request(app, method, path, json_body=None, headers=None, body=b"", content_type=None):
+    # In-process ASGI client for tests and benchmarks. Returns
+    # (status, headers, body) with the body fully read.
+    if json_body is not None:
+        body = json.dumps(json_body).encode()
+        content_type = content_type or "application/json"
+    path, _, query = path.partition("?")
+    raw_headers = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    if content_type:
+        raw_headers.append((b"content-type", content_type.encode()))
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(), "headers": raw_headers}
+    sent = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    response_headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return start["status"], response_headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+
+app = AsyncApp()
@@ -0,0 +1,125 @@
+"""Side-by-side benchmark of the sync (Flask) and async (ASGI) serving modes.
+
+    python -m benchmarks.async_vs_sync --rows 100000 --concurrency 200 --threads 16
+
+Both modes serve the same mix of donor detail and list-page reads against the
+same seeded database, with the record cache disabled so every request reaches
+the database. The sync mode is limited to --threads concurrent requests, as a
+threaded WSGI worker would be; the async mode keeps --concurrency requests in
+flight on one event loop. With the default SQLite file the database is local
+and fast, so the difference mostly reflects per-request overhead. Point
+--database-url/--async-database-url at a real MySQL server (driver
+mysqlconnector vs aiomysql) to see how each mode holds up when round trips
+are slow.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.run import open_database, summarize
+
+
+def request_paths(rng, rows, count):
+    paths = []
+    for _ in range(count):
+        if rng.random() < 0.8:
+            paths.append(f"/donor/{rng.randrange(1, rows + 1)}")
+        else:
+            paths.append(f"/donor?after={rng.randrange(rows)}&limit=50")
+    return paths
+
+
+def run_sync(app, headers, paths, threads):
+    local = threading.local()
+    errors = []
+
+    def call(path):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        began = time.perf_counter()
+        response = local.client.get(path, headers=headers)
+        response.get_data()
+        if response.status_code != 200:
+            errors.append(path)
+        return time.perf_counter() - began
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(pool.map(call, paths))
+    return summarize(samples, time.perf_counter() - start, len(errors))
+
+
+def run_async(async_app, headers, paths, concurrency):
+    from async_program import asgi_request
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        errors = []
+
+        async def call(path):
+            async with semaphore:
+                began = time.perf_counter()
+                status, _, _ = await asgi_request(async_app, "GET", path, headers=headers)
+                if status != 200:
+                    errors.append(path)
+                return time.perf_counter() - began
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*[call(path) for path in paths])
+        elapsed = time.perf_counter() - start
+        await async_app.engine.dispose()
+        return summarize(samples, elapsed, len(errors))
+
+    return asyncio.run(main())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8, help="worker threads for the sync mode")
+    parser.add_argument("--concurrency", type=int, default=100, help="in-flight requests for the async mode")
+    parser.add_argument("--data-dir", default=".bench")
+    parser.add_argument("--database-url", help="use this database for the sync mode instead of the seeded SQLite file")
+    parser.add_argument("--async-database-url", help="use this database for the async mode")
+    args = parser.parse_args(argv)
+    args.staff_rows = 0
+    warnings.filterwarnings("ignore", module="jwt")
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+        from program import app
+        from flask_jwt_extended import create_access_token
+        with app.app_context():
+            token = create_access_token(identity="staff", additional_claims={"role": "admin"})
+    else:
+        app, token, _ = open_database(args)
+
+    from cache import LRUCache
+    from async_program import AsyncApp
+
+    app.extensions['record_cache'] = LRUCache(0)
+    async_app = AsyncApp({'ASYNC_DATABASE_URI': args.async_database_url} if args.async_database_url else None)
+    headers = {"Authorization": f"Bearer {token}"}
+    paths = request_paths(random.Random(args.seed), args.rows, args.requests)
+
+    results = {
+        f"sync ({args.threads} threads)": run_sync(app, headers, paths, args.threads),
+        f"async ({args.concurrency} in flight)": run_async(async_app, headers, paths, args.concurrency)
+    }
+    print(f"{'mode':28} {'n':>6} {'err':>5} {'rps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        print(f"{name:28} {result['iterations']:>6} {result['errors']:>5} {result['throughput_rps']:>10} "
+              f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
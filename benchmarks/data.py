@@ -0,0 +1,95 @@
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = ["Maria", "Jose", "Ana", "Juan", "Rosa", "Pedro", "Elena", "Mark", "Grace", "Paolo", "Liza", "Ramon"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Castillo", "Flores", "Ramos"]
+GENDERS = ["Male", "Female"]
+CATEGORIES = ["Nurse", "Doctor", "Technician", "Administrative", "Phlebotomist"]
+JOB_TITLES = ["Staff Nurse", "Head Nurse", "Resident", "Lab Technician", "Clerk", "Supervisor"]
+
+BLOOD_BANKS = 40
+ADDRESSES = 5000
+MEDICATIONS = 25
+MEDICAL_CONDITIONS = 15
+# Approximate population frequencies.
+BLOOD_TYPES = {"O+": 38, "A+": 34, "B+": 9, "O-": 7, "A-": 6, "AB+": 3, "B-": 2, "AB-": 1}
+# Bump when the generated rows change, so cached seed files are regenerated.
+VERSION = 3
+
+
+def birthdate(rng):
+    return (date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55))).isoformat()
+
+
+def last_donation_date(rng):
+    if rng.random() < 0.4:
+        return None
+    return (date.today() - timedelta(days=rng.randrange(730))).isoformat()
+
+
+def name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def donor(rng):
+    return {
+        "gender": rng.choice(GENDERS),
+        "birthdate": birthdate(rng),
+        "name": name(rng),
+        "contact": f"09{rng.randrange(10 ** 9):09d}",
+        "BLOOD_BANKS_id": rng.randrange(1, BLOOD_BANKS + 1),
+        "MEDICATIONS_code": rng.randrange(MEDICATIONS),
+        "MEDICAL_CONDITIONS_code": rng.randrange(MEDICAL_CONDITIONS),
+        "blood_type": rng.choices(list(BLOOD_TYPES), weights=list(BLOOD_TYPES.values()))[0],
+        "last_donation_date": last_donation_date(rng)
+    }
+
+
+def staff(rng):
+    return {
+        "BLOOD_BANKS_id": rng.randrange(1, BLOOD_BANKS + 1),
+        "ADDRESS_id": rng.randrange(1, ADDRESSES + 1),
+        "category": rng.choice(CATEGORIES),
+        "gender": rng.choice(GENDERS),
+        "job_title": rng.choice(JOB_TITLES),
+        "name": name(rng),
+        "birthdate": birthdate(rng)
+    }
+
+
+def generate(factory, count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield factory(rng)
+
+
+def seed_table(db, model, factory, count, seed, chunk=10000):
+    # Core executemany in chunks keeps seeding a million rows tractable.
+    rows = []
+    for row in generate(factory, count, seed):
+        rows.append(row)
+        if len(rows) >= chunk:
+            db.session.execute(model.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+    db.session.commit()
+
+
+def seed_references(db):
+    from program import BloodBank, MedicalCondition, Medication
+
+    db.session.execute(BloodBank.__table__.insert(), [{"id": id, "name": f"Blood Bank {id}"} for id in range(1, BLOOD_BANKS + 1)])
+    db.session.execute(Medication.__table__.insert(), [{"code": code, "name": f"Medication {code}"} for code in range(MEDICATIONS)])
+    db.session.execute(MedicalCondition.__table__.insert(), [{"code": code, "name": f"Condition {code}"} for code in range(MEDICAL_CONDITIONS)])
+    db.session.commit()
+
+
+def seed(db, donors, staff_count, seed=1):
+    from program import Donors, Staff, rebuild_summaries
+
+    seed_references(db)
+    seed_table(db, Donors, donor, donors, seed)
+    seed_table(db, Staff, staff, staff_count, seed + 1)
+    # Core inserts skip the session hooks that keep the /stats counts.
+    rebuild_summaries()
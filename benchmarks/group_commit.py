@@ -0,0 +1,92 @@
+"""Concurrent single-row inserts with and without the group-commit writer.
+
+    python -m benchmarks.group_commit --requests 2000 --threads 32
+
+Both modes send the same POST /staff requests from --threads concurrent
+clients against a fresh copy of the seeded database. "per-request" commits
+every insert on its own; "group" queues them for the background writer, which
+commits up to GROUP_COMMIT_MAX_BATCH rows at a time. SQLite serializes
+writers on a file lock, so the default setup already shows the cost of one
+commit per row; point --database-url at MySQL to measure fsync-bound commits.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import data
+from benchmarks.run import open_database, summarize
+
+
+def run(app, headers, payloads, threads):
+    local = threading.local()
+    errors = []
+
+    def call(payload):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        began = time.perf_counter()
+        response = local.client.post('/staff', json=payload, headers=headers)
+        if response.status_code != 201:
+            errors.append(response.status_code)
+        return time.perf_counter() - began
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(pool.map(call, payloads))
+    return summarize(samples, time.perf_counter() - start, len(errors))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=100)
+    parser.add_argument("--max-delay-ms", type=float, default=5)
+    parser.add_argument("--data-dir", default=".bench")
+    parser.add_argument("--database-url", help="benchmark against this database instead of the seeded SQLite file")
+    args = parser.parse_args(argv)
+    args.staff_rows = args.rows
+    warnings.filterwarnings("ignore", module="jwt")
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+        from program import app
+        from flask_jwt_extended import create_access_token
+        with app.app_context():
+            token = create_access_token(identity="staff", additional_claims={"role": "admin"})
+    else:
+        app, token, _ = open_database(args)
+
+    from program import group_commit_batch_size
+
+    app.config['GROUP_COMMIT_MAX_BATCH'] = args.max_batch
+    app.config['GROUP_COMMIT_MAX_DELAY_MS'] = args.max_delay_ms
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = random.Random(args.seed)
+    payloads = [data.staff(rng) for _ in range(args.requests)]
+
+    results = {}
+    for mode in ("per-request", "group"):
+        app.config['GROUP_COMMIT'] = mode == "group"
+        results[mode] = run(app, headers, payloads, args.threads)
+    app.extensions.pop('group_writer').close()
+
+    print(f"{'mode':14} {'n':>6} {'err':>5} {'rps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        print(f"{name:14} {result['iterations']:>6} {result['errors']:>5} {result['throughput_rps']:>10} "
+              f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+    samples = {name: value for name, _, value in group_commit_batch_size.samples()}
+    if samples.get("group_commit_batch_size_count"):
+        print(f"\nmean group-commit batch: {samples['group_commit_batch_size_sum'] / samples['group_commit_batch_size_count']:.1f} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Benchmark every route in program.py against a seeded SQLite database.
+
+    python -m benchmarks.run --rows 100000 --output results.json
+    python -m benchmarks.run --rows 100000 --compare results.json
+
+Seeded databases are cached in --data-dir, so only the first run at a given
+size pays for generating the rows. Each run works on a fresh copy.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+import warnings
+from urllib.parse import urlencode
+
+from benchmarks import data
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples, elapsed, errors):
+    return {
+        "iterations": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3)
+    }
+
+
+def measure(request, iterations, expected):
+    samples = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        began = time.perf_counter()
+        response = request(i)
+        response.get_data()
+        samples.append(time.perf_counter() - began)
+        if response.status_code not in expected:
+            errors += 1
+    return summarize(samples, time.perf_counter() - start, errors)
+
+
+def scenarios(client, headers, rng, rows, staff_rows, args):
+    donor_payload = lambda i: dict(data.donor(rng), ADDRESS_id=rng.randrange(1, data.ADDRESSES + 1))
+    staff_payload = lambda i: data.staff(rng)
+    bulk = args.bulk_size
+
+    yield "login", lambda i: client.post('/login', json={"username": "staff", "password": "password"}), args.iterations, (200,)
+    yield "cache_stats", lambda i: client.get('/cache/stats', headers=headers), args.iterations, (200,)
+    yield "stats", lambda i: client.get('/stats', headers=headers), args.iterations, (200,)
+    # The first request builds the donor snapshot; later ones only refresh it.
+    match_query = lambda: urlencode({"BLOOD_BANKS_id": rng.randrange(1, data.BLOOD_BANKS + 1), "blood_type": rng.choice(list(data.BLOOD_TYPES)), "limit": 50})
+    yield "donor_match", lambda i: client.get(f'/donor/match?{match_query()}', headers=headers), args.iterations, (200,)
+    search_query = lambda: urlencode({"q": data.name(rng)[:rng.randrange(3, 12)], "limit": 20})
+    yield "donor_search", lambda i: client.get(f'/donor/search?{search_query()}', headers=headers), args.iterations, (200,)
+
+    for path, count, payload in (("staff", staff_rows, staff_payload), ("donor", rows, donor_payload)):
+        field = "category" if path == "staff" else "BLOOD_BANKS_id"
+        value = lambda: rng.choice(data.CATEGORIES) if path == "staff" else rng.randrange(1, data.BLOOD_BANKS + 1)
+        yield f"{path}_list_page", lambda i: client.get(f'/{path}?after={rng.randrange(count)}&limit=100', headers=headers), args.iterations, (200,)
+        yield f"{path}_list_filtered", lambda i: client.get(f'/{path}?{field}={value()}&limit=100', headers=headers), args.iterations, (200,)
+        yield f"{path}_list_include", lambda i: client.get(f'/{path}?after={rng.randrange(count)}&limit=100&include=blood_bank', headers=headers), args.iterations, (200,)
+        yield f"{path}_list_fields", lambda i: client.get(f'/{path}?fields=name&after={rng.randrange(count)}&limit=100', headers=headers), args.iterations, (200,)
+        yield f"{path}_list_stream", lambda i: client.get(f'/{path}', headers=headers), args.stream_iterations, (200,)
+        yield f"{path}_detail", lambda i: client.get(f'/{path}/{rng.randrange(1, count + 1)}', headers=headers), args.iterations, (200,)
+        hot = [rng.randrange(1, count + 1) for _ in range(50)]
+        yield f"{path}_detail_hot", lambda i: client.get(f'/{path}/{hot[i % len(hot)]}', headers=headers), args.iterations, (200, 304)
+        yield f"{path}_create", lambda i: client.post(f'/{path}', json=payload(i), headers=headers), args.iterations, (201,)
+        yield f"{path}_bulk_create", lambda i: client.post(f'/{path}/bulk', json=[payload(i) for _ in range(bulk)], headers=headers), max(1, args.iterations // 10), (200,)
+        yield f"{path}_update", lambda i: client.put(f'/{path}/{rng.randrange(1, count // 2 + 1)}', json={"name": data.name(rng)}, headers=headers), args.iterations, (200,)
+        # Deletes walk down from the top of the seeded range so they never
+        # collide with the ids the update scenario picks from.
+        yield f"{path}_delete", lambda i: client.delete(f'/{path}/{count - i}', headers=headers), min(args.iterations, count // 2), (200,)
+
+
+def prepare_database(args):
+    os.makedirs(args.data_dir, exist_ok=True)
+    staff_rows = args.staff_rows if args.staff_rows is not None else args.rows
+    seeded = os.path.join(args.data_dir, f"bench-v{data.VERSION}-{args.rows}-{staff_rows}-{args.seed}.sqlite")
+    work = os.path.join(args.data_dir, "work.sqlite")
+    if os.path.exists(work):
+        os.remove(work)
+    if os.path.exists(seeded):
+        shutil.copyfile(seeded, work)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.abspath(work)}"
+    return seeded, work, staff_rows
+
+
+def open_database(args):
+    # Points the app at a fresh copy of the seeded database (seeding it on
+    # first use) and returns the app, an admin token and the staff row count.
+    seeded, work, staff_rows = prepare_database(args)
+
+    from program import app, db
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        if not os.path.exists(seeded):
+            print(f"seeding {args.rows} donors and {staff_rows} staff into {seeded}", file=sys.stderr)
+            db.create_all()
+            data.seed(db, args.rows, staff_rows, args.seed)
+            db.engine.dispose()
+            shutil.copyfile(work, seeded)
+        # Seeded files made by older revisions lack tables added since.
+        db.create_all()
+        token = create_access_token(identity="staff", additional_claims={"role": "admin"})
+    return app, token, staff_rows
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_regression):
+    regressed = []
+    print(f"\n{'scenario':28} {'p95 base':>10} {'p95 now':>10} {'change':>8}")
+    for name, current in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+        print(f"{name:28} {before['p95_ms']:>10.3f} {current['p95_ms']:>10.3f} {change:>+7.1f}%")
+        if max_regression is not None and change > max_regression:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="donor rows to seed (10000, 100000, 1000000, ...)")
+    parser.add_argument("--staff-rows", type=int, help="staff rows to seed (defaults to --rows)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--stream-iterations", type=int, default=3, help="iterations of the full-table streamed listings")
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--scenario", action="append", help="only run scenarios whose name contains this (repeatable)")
+    parser.add_argument("--data-dir", default=".bench")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare p95 latency against")
+    parser.add_argument("--max-regression", type=float, help="exit non-zero if any p95 regresses by more than this percent")
+    args = parser.parse_args(argv)
+    # The development JWT secret is short; PyJWT warns on every encode/decode.
+    warnings.filterwarnings("ignore", module="jwt")
+
+    app, token, staff_rows = open_database(args)
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = random.Random(args.seed)
+    results = {
+        "meta": {
+            "rows": args.rows,
+            "staff_rows": staff_rows,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        },
+        "scenarios": {}
+    }
+
+    print(f"{'scenario':28} {'n':>6} {'err':>5} {'rps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    with app.test_client() as client:
+        for name, request, iterations, expected in scenarios(client, headers, rng, args.rows, staff_rows, args):
+            if args.scenario and not any(part in name for part in args.scenario):
+                continue
+            result = measure(request, iterations, expected)
+            results["scenarios"][name] = result
+            print(f"{name:28} {result['iterations']:>6} {result['errors']:>5} {result['throughput_rps']:>10} "
+                  f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.max_regression)
+        if regressed:
+            print(f"\np95 regressed beyond {args.max_regression}%: {', '.join(regressed)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
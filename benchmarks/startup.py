@@ -0,0 +1,83 @@
+"""Cold-start timings for a fresh worker process.
+
+    python -m benchmarks.startup --runs 10
+
+Each run starts a new interpreter that imports program, calls create_app(),
+serves POST /login (no database) and then GET /staff (first connection and
+query) against a local SQLite file. The medians show how long an autoscaled
+worker takes before it can answer its first request. "process" is the wall
+time of the whole child, interpreter startup included.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PREPARE = """
+import program
+with program.create_app().app_context():
+    program.db.create_all()
+"""
+
+CHILD = """
+import json, sys, time, warnings
+warnings.filterwarnings("ignore", module="jwt")
+began = time.perf_counter()
+import program
+imported = time.perf_counter()
+app = program.create_app()
+created = time.perf_counter()
+client = app.test_client()
+token = client.post('/login', json={"username": "staff", "password": "password"}).get_json()["Token"]
+first_response = time.perf_counter()
+response = client.get('/staff', headers={"Authorization": f"Bearer {token}"})
+response.get_data()
+status = response.status_code
+first_query = time.perf_counter()
+json.dump({
+    "status": status,
+    "import_ms": (imported - began) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_response_ms": (first_response - created) * 1000,
+    "first_query_ms": (first_query - first_response) * 1000
+}, sys.stdout)
+"""
+
+
+def run_child(env):
+    began = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout)
+    timings["process_ms"] = (time.perf_counter() - began) * 1000
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="connect to this database instead of a temporary SQLite file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+        if not args.database_url:
+            subprocess.run([sys.executable, "-c", PREPARE], env=env, check=True)
+        runs = [run_child(env) for _ in range(args.runs)]
+
+    errors = sum(1 for timings in runs if timings["status"] != 200)
+    print(f"{'phase':18} {'median ms':>10} {'min ms':>9} {'max ms':>9}")
+    for phase in ("import_ms", "create_app_ms", "first_response_ms", "first_query_ms", "process_ms"):
+        samples = [timings[phase] for timings in runs]
+        print(f"{phase[:-3]:18} {statistics.median(samples):>10.1f} {min(samples):>9.1f} {max(samples):>9.1f}")
+    if errors:
+        print(f"\n{errors} of {len(runs)} runs did not get 200 from GET /staff")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
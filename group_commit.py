@@ -0,0 +1,86 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitWriter:
+    # Collects items submitted by concurrent request threads and hands them
+    # to flush() in batches from one background thread, so many small writes
+    # share a single commit. A batch is flushed once it holds max_batch items
+    # or its oldest item has waited max_delay seconds, whichever comes first.
+    # flush(items) returns one result per item, in order; each submitter's
+    # future resolves with its own result only after flush() has returned.
+
+    def __init__(self, flush, max_batch=100, max_delay=0.005, batch_sizes=None, queue_delays=None):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batch_sizes = batch_sizes
+        self.queue_delays = queue_delays
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self._start()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def close(self):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = entry[2] + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch:
+                # Past the deadline, only items that are already queued join
+                # the batch.
+                timeout = deadline - time.perf_counter()
+                try:
+                    entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        if self.batch_sizes is not None:
+            self.batch_sizes.observe(len(batch))
+        if self.queue_delays is not None:
+            for _, _, enqueued in batch:
+                self.queue_delays.observe(started - enqueued)
+        try:
+            results = self.flush([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,136 @@
+from datetime import date
+import time
+
+import numpy as np
+
+BLOOD_TYPES = ("O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+")
+
+# Red cell compatibility: recipient type -> donor types it can receive.
+COMPATIBLE_DONORS = {
+    "O-": ("O-",),
+    "O+": ("O-", "O+"),
+    "A-": ("O-", "A-"),
+    "A+": ("O-", "O+", "A-", "A+"),
+    "B-": ("O-", "B-"),
+    "B+": ("O-", "O+", "B-", "B+"),
+    "AB-": ("O-", "A-", "B-", "AB-"),
+    "AB+": BLOOD_TYPES
+}
+
+# Snapshot column -> Donors column, in the order rows are read. Dates are
+# stored as days since 1970-01-01 and blood types as their index in
+# BLOOD_TYPES, or -1 when unknown.
+COLUMNS = {
+    "id": "id",
+    "bank": "BLOOD_BANKS_id",
+    "blood_type": "blood_type",
+    "birthdate": "birthdate",
+    "last_donation": "last_donation_date",
+    "medication": "MEDICATIONS_code",
+    "condition": "MEDICAL_CONDITIONS_code"
+}
+DATE_COLUMNS = ("birthdate", "last_donation")
+# Stands in for a missing date: a donor who never gave blood has rested
+# indefinitely.
+NEVER = -(2 ** 40)
+
+# Days of rest after which a donor scores no higher for having waited longer.
+FULLY_RESTED_DAYS = 365
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+def years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        # 29 February in a non-leap year.
+        return day.replace(year=day.year - years, day=28)
+
+
+def encode_columns(rows):
+    # Rows are tuples in COLUMNS order, with dates as 'YYYY-MM-DD' strings or
+    # date objects. Each column is converted by NumPy in a single pass.
+    values = list(zip(*rows)) or [()] * len(COLUMNS)
+    codes = {blood_type: code for code, blood_type in enumerate(BLOOD_TYPES)}
+    arrays = {}
+    for name, column in zip(COLUMNS, values):
+        if name == "blood_type":
+            arrays[name] = np.array([codes.get(value, -1) for value in column], dtype=np.int64)
+        elif name in DATE_COLUMNS:
+            days = np.array(column, dtype="datetime64[D]")
+            arrays[name] = np.where(np.isnat(days), NEVER, days.astype(np.int64))
+        else:
+            arrays[name] = np.array(column, dtype=np.int64)
+    return arrays
+
+
+class DonorSnapshot:
+    # The donor fields matching needs, one NumPy array per column, so a
+    # ranking is a handful of vectorized comparisons over every donor
+    # instead of a Python loop. version is the change log cursor the
+    # snapshot is known to be current up to. Deleted donors keep their row,
+    # with bank -1, until the snapshot is rebuilt.
+
+    def __init__(self, batches, version):
+        chunks = [encode_columns(rows) for rows in batches] or [encode_columns([])]
+        self.columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+        self.positions = {id: i for i, id in enumerate(self.columns["id"].tolist())}
+        self.version = version
+        self.built = time.monotonic()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def apply(self, rows, deleted):
+        # Brings changed donors up to date: rows are their current values,
+        # deleted the ids that no longer exist.
+        changed = encode_columns(rows)
+        positions = [self.positions.get(id) for id in changed["id"].tolist()]
+        existing = np.array([position is not None for position in positions], dtype=bool)
+        if existing.any():
+            targets = np.array([position for position in positions if position is not None])
+            for name in COLUMNS:
+                self.columns[name][targets] = changed[name][existing]
+        if not existing.all():
+            start = len(self.columns["id"])
+            for name in COLUMNS:
+                self.columns[name] = np.concatenate([self.columns[name], changed[name][~existing]])
+            for offset, id in enumerate(self.columns["id"][start:].tolist()):
+                self.positions[id] = start + offset
+        for id in deleted:
+            position = self.positions.pop(id, None)
+            if position is not None:
+                self.columns["bank"][position] = -1
+
+    def rank(self, bank, blood_type, today, limit, min_age=18, max_age=65, interval_days=56,
+             excluded_medications=(), excluded_conditions=(), among=None):
+        # Returns (eligible count, [(id, score), ...]) for the best limit
+        # donors. Donors of the requested type come first, which keeps O-
+        # donors for the patients who can only receive O-; within a type,
+        # those who have rested longest rank highest. Ties go to the lower id.
+        # among, if given, limits the ranking to those donor ids.
+        columns = self.columns
+        compatible = [BLOOD_TYPES.index(donor_type) for donor_type in COMPATIBLE_DONORS[blood_type]]
+        rested = day_number(today) - columns["last_donation"]
+        eligible = (columns["bank"] == bank) & np.isin(columns["blood_type"], compatible)
+        eligible &= columns["birthdate"] <= day_number(years_before(today, min_age))
+        eligible &= columns["birthdate"] > day_number(years_before(today, max_age + 1))
+        eligible &= rested >= interval_days
+        if excluded_medications:
+            eligible &= ~np.isin(columns["medication"], list(excluded_medications))
+        if excluded_conditions:
+            eligible &= ~np.isin(columns["condition"], list(excluded_conditions))
+        if among is not None:
+            eligible &= np.isin(columns["id"], np.array(among, dtype=np.int64))
+
+        candidates = np.flatnonzero(eligible)
+        exact = columns["blood_type"][candidates] == BLOOD_TYPES.index(blood_type)
+        scores = exact + np.minimum(rested[candidates], FULLY_RESTED_DAYS) / FULLY_RESTED_DAYS
+        order = np.lexsort((columns["id"][candidates], -scores))[:limit]
+        ranked = zip(columns["id"][candidates[order]].tolist(), scores[order].round(4).tolist())
+        return len(candidates), list(ranked)
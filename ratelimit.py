@@ -0,0 +1,87 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@lru_cache(maxsize=256)
+def parse_rate(spec):
+    # "120/minute" -> (capacity, tokens per second). The bucket holds up to
+    # the full count, so a quiet client may spend it in one burst.
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*", spec)
+    if not match:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '120/minute'")
+    count, multiple, period = int(match.group(1)), int(match.group(2) or 1), match.group(3)
+    if count < 1 or multiple < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}")
+    return count, count / (multiple * PERIODS[period])
+
+
+def refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class RateLimitStore:
+    # Holds one token bucket per key. Subclass this to share the buckets
+    # between workers, e.g. in Redis with a script that applies take() to
+    # the stored (tokens, updated) pair atomically.
+
+    def take(self, key, capacity, rate, cost=1):
+        # Removes cost tokens from the bucket if it has them. Returns 0 when
+        # the request is allowed, otherwise the seconds until it would be.
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    # Per-process buckets. The least recently used are dropped past
+    # maxsize; a dropped bucket comes back full.
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated, now, capacity, rate)
+            wait = 0 if tokens >= cost else (cost - tokens) / rate
+            if not wait:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class LoadShedder:
+    # Counts requests in flight and refuses new ones past max_in_flight.
+    # None disables the limit.
+
+    def __init__(self, max_in_flight=None):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
@@ -0,0 +1,120 @@
+import gc
+import heapq
+import math
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from itertools import chain
+
+
+def normalize(text):
+    # Case, accents and punctuation are ignored: "José-María" -> "jose maria".
+    text = str(text)
+    if text.isascii():
+        text = text.lower()
+    else:
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+@lru_cache(maxsize=65536)
+def word_trigrams(word, open_end=False):
+    # The word padded with two spaces in front and one behind, so the
+    # trigrams also record where it starts and ends. open_end leaves the end
+    # unmarked: "mar" then matches "maria" in full.
+    padded = "  " + word if open_end else "  " + word + " "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigrams(text, prefix=False):
+    # With prefix, the last word is taken as the start of a longer one.
+    words = normalize(text).split()
+    if prefix and words:
+        return frozenset().union(*map(word_trigrams, words[:-1]), word_trigrams(words[-1], True))
+    return frozenset().union(*map(word_trigrams, words))
+
+
+class TrigramIndex:
+    # Maps each trigram to the keys whose text contains it. A search scores
+    # a key by the share of the query's trigrams it contains, so a
+    # misspelling still matches on the trigrams it got right.
+
+    def __init__(self):
+        self.postings = {}
+        self.grams = {}
+
+    def __len__(self):
+        return len(self.grams)
+
+    def add(self, key, *values):
+        self.remove(key)
+        # A tuple rather than a set: the garbage collector stops tracking
+        # tuples of strings, so millions of them cost it nothing.
+        grams = tuple(frozenset().union(*(trigrams(value) for value in values if value is not None)))
+        self.grams[key] = grams
+        postings = self.postings
+        for gram in grams:
+            keys = postings.get(gram)
+            if keys is None:
+                postings[gram] = {key}
+            else:
+                keys.add(key)
+
+    def add_many(self, rows):
+        # rows are (key, *values). Loading allocates millions of objects,
+        # and the cyclic garbage collector would keep rescanning the growing
+        # heap, so it is paused meanwhile; the index holds no cycles.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for key, *values in rows:
+                self.add(key, *values)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def remove(self, key):
+        for gram in self.grams.pop(key, ()):
+            self.postings[gram].discard(key)
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def search(self, query, limit, min_similarity=0.5, max_candidates=5000):
+        # [(key, score), ...] for the best limit keys, best first. A key
+        # scoring at least min_similarity shares enough trigrams with the
+        # query that it must appear in one of the rarest few posting lists,
+        # so only those are read, and at most max_candidates keys from them
+        # are scored. The work therefore depends on the query, not on the
+        # number of keys. Equal scores go to the key with fewer extra
+        # trigrams, then the lower key.
+        query_grams = trigrams(query, prefix=True)
+        if not query_grams:
+            return []
+        needed = max(1, math.ceil(min_similarity * len(query_grams)))
+        lists = sorted((self.postings.get(gram, ()) for gram in query_grams), key=len)
+        seen = set()
+        scored = []
+        for key in chain.from_iterable(lists[:len(query_grams) - needed + 1]):
+            if key in seen:
+                continue
+            if len(seen) >= max_candidates:
+                break
+            seen.add(key)
+            grams = self.grams[key]
+            shared = len(query_grams.intersection(grams))
+            if shared >= needed:
+                scored.append((shared / len(query_grams), shared / len(grams), -key, key))
+        best = heapq.nlargest(limit, scored)
+        return [(key, round(score, 4)) for score, _, _, key in best]
+
+
+class SearchIndex:
+    # One TrigramIndex per table. version is the change log cursor the
+    # index is current up to.
+
+    def __init__(self, tables, version=0):
+        self.indexes = {table: TrigramIndex() for table in tables}
+        self.version = version
+        self.built = time.monotonic()
@@ -0,0 +1,83 @@
+import heapq
+import threading
+
+# Ids interleave the shards: id % MAX_SHARDS is the index of the shard that
+# created the record, so a lookup by id knows where to look first. Shards
+# are indexed in the order they are configured, which must not change.
+MAX_SHARDS = 64
+
+
+class ShardMoving(Exception):
+    # Writes for a blood bank are refused while its rows move between shards.
+    pass
+
+
+class IdAllocator:
+    # Hands out the ids of one table on one shard. Sequence numbers are
+    # reserved in blocks of block_size through reserve(), which returns the
+    # number of a block no other process has been given, so most ids cost no
+    # database round trip.
+
+    def __init__(self, shard_index, reserve, block_size=100):
+        if not 0 <= shard_index < MAX_SHARDS:
+            raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+        self.shard_index = shard_index
+        self.reserve = reserve
+        self.block_size = block_size
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._next == self._end:
+                block = self.reserve()
+                self._next, self._end = block * self.block_size, (block + 1) * self.block_size
+            sequence = self._next
+            self._next += 1
+        return sequence * MAX_SHARDS + self.shard_index
+
+
+def first_block(max_id, block_size):
+    # The first block whose ids are all above max_id, whichever shard they
+    # belong to.
+    return max_id // (block_size * MAX_SHARDS) + 1
+
+
+def home_shard(id, shards):
+    # The shard that created the record, if it still exists.
+    index = id % MAX_SHARDS
+    return shards[index] if index < len(shards) else None
+
+
+def merge_by_id(results):
+    # Merges per-shard results, each already ordered by id, into one lazily
+    # ordered stream. A record seen twice (it is being moved between shards)
+    # is kept once.
+    last = None
+    for record in heapq.merge(*results, key=lambda record: record["id"]):
+        if record["id"] != last:
+            last = record["id"]
+            yield record
+
+
+def plan_rebalance(loads):
+    # loads maps each shard to {bank: rows}. Returns the moves, as (bank,
+    # from shard, to shard), that bring the shards' row counts closest
+    # together: repeatedly the bank on the fullest shard whose move to the
+    # emptiest shard narrows the gap the most, until no move narrows it.
+    loads = {shard: dict(banks) for shard, banks in loads.items()}
+    totals = {shard: sum(banks.values()) for shard, banks in loads.items()}
+    moves = []
+    while len(totals) > 1:
+        fullest = max(totals, key=lambda shard: (totals[shard], shard))
+        emptiest = min(totals, key=lambda shard: (totals[shard], shard))
+        gap = totals[fullest] - totals[emptiest]
+        candidates = [(abs(gap - 2 * rows), bank, rows) for bank, rows in loads[fullest].items() if 0 < rows < gap]
+        if not candidates:
+            return moves
+        _, bank, rows = min(candidates)
+        moves.append((bank, fullest, emptiest))
+        loads[emptiest][bank] = loads[fullest].pop(bank)
+        totals[fullest] -= rows
+        totals[emptiest] += rows
+    return moves
@@ -0,0 +1,133 @@
+import math
+import time
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Farther than any two points on Earth can be.
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    # Points bucketed into cells of cell_size degrees of latitude and
+    # longitude. A radius query only measures the points in the cells that
+    # overlap the circle's bounding box, and a nearest query widens its
+    # radius until it has enough points.
+
+    def __init__(self, cell_size=0.1):
+        self.cell_size = cell_size
+        self.columns = math.ceil(360 / cell_size)
+        self.rows = math.ceil(180 / cell_size)
+        self.cells = {}
+        self.points = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell(self, lat, lon):
+        row = min(int((lat + 90) // self.cell_size), self.rows - 1)
+        return row, int((lon + 180) // self.cell_size) % self.columns
+
+    def add(self, key, lat, lon):
+        self.remove(key)
+        self.points[key] = (lat, lon)
+        self.cells.setdefault(self.cell(lat, lon), set()).add(key)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self.cell(*point)
+        self.cells[cell].discard(key)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def candidate_cells(self, lat, lon, radius_km):
+        # The cells overlapping the bounding box of the circle, wrapping
+        # around the antimeridian. When the box spans more cells than are
+        # occupied, the occupied cells are filtered instead.
+        span = radius_km / KM_PER_DEGREE
+        south, north = max(-90.0, lat - span), min(90.0, lat + span)
+        widest = math.cos(math.radians(max(abs(south), abs(north))))
+        full_width = north >= 90 or south <= -90 or span >= 180 * widest
+        first_row, last_row = self.cell(south, 0)[0], self.cell(north, 0)[0]
+        if full_width:
+            columns = None
+        else:
+            first, last = self.cell(lat, lon - span / widest)[1], self.cell(lat, lon + span / widest)[1]
+            count = (last - first) % self.columns + 1
+            columns = {(first + offset) % self.columns for offset in range(count)}
+        area = (last_row - first_row + 1) * (len(columns) if columns is not None else self.columns)
+        if area > len(self.cells):
+            return [cell for cell in self.cells
+                    if first_row <= cell[0] <= last_row and (columns is None or cell[1] in columns)]
+        return [(row, column) for row in range(first_row, last_row + 1)
+                for column in (columns if columns is not None else range(self.columns))
+                if (row, column) in self.cells]
+
+    def within(self, lat, lon, radius_km):
+        # [(key, distance_km), ...] for every point within radius_km,
+        # nearest first.
+        found = []
+        for cell in self.candidate_cells(lat, lon, radius_km):
+            for key in self.cells[cell]:
+                distance = haversine(lat, lon, *self.points[key])
+                if distance <= radius_km:
+                    found.append((key, distance))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return found
+
+    def nearest(self, lat, lon, k, radius_km=MAX_DISTANCE_KM):
+        # Once at least k points lie within the search radius, the k nearest
+        # of them are the k nearest overall.
+        search = min(radius_km, self.cell_size * KM_PER_DEGREE)
+        while True:
+            found = self.within(lat, lon, search)
+            if len(found) >= k or search >= radius_km:
+                return found[:k]
+            search = min(radius_km, search * 2)
+
+
+class LocationIndex:
+    # Where every donor and staff member lives: each address's coordinates,
+    # who lives there, and one GridIndex per table over those people. Moving
+    # an address moves its residents with it. version is the change log
+    # cursor the index is current up to.
+
+    def __init__(self, tables, cell_size=0.1, version=0):
+        self.addresses = {}
+        self.residents = {}
+        self.homes = {}
+        self.grids = {table: GridIndex(cell_size) for table in tables}
+        self.version = version
+        self.built = time.monotonic()
+
+    def set_address(self, address_id, lat, lon):
+        self.addresses[address_id] = (lat, lon)
+        for table, id in self.residents.get(address_id, ()):
+            self.grids[table].add(id, lat, lon)
+
+    def remove_address(self, address_id):
+        self.addresses.pop(address_id, None)
+        for table, id in self.residents.get(address_id, ()):
+            self.grids[table].remove(id)
+
+    def place(self, table, id, address_id):
+        # address_id None removes the record.
+        previous = self.homes.pop((table, id), None)
+        if previous is not None:
+            self.residents[previous].discard((table, id))
+            if not self.residents[previous]:
+                del self.residents[previous]
+        self.grids[table].remove(id)
+        if address_id is None:
+            return
+        self.homes[(table, id)] = address_id
+        self.residents.setdefault(address_id, set()).add((table, id))
+        if address_id in self.addresses:
+            self.grids[table].add(id, *self.addresses[address_id])